@@ -0,0 +1,307 @@
+import argparse
+import json
+import os
+import sys
+
+import database
+from database import (initialize_database, iter_collections, add_collection_to_db, add_collections_bulk,
+                      tag_collections, reindex_database, optimize_database, get_all_tags,
+                      get_existing_collection_ids)
+from health_check import run_health_check, DEFAULT_MAX_AGE
+import thumbnails
+from thumbnails import find_first_image_in_folder, prewarm_thumbnails
+
+"""
+Headless command-line interface
+
+Scripted batch operations on the collection database, without starting the Kivy window.
+This module must never import Kivy.
+
+    python cli.py list --tag "80s" --format json
+    python cli.py add "My Collection A" /path/to/folderA --tags "illustration, 80s"
+    python cli.py import /path/to/library --tags "to sort"
+    python cli.py tag --query poster --tags "movie poster"
+    python cli.py check --force
+    python cli.py thumbnails
+    python cli.py colors --search Blue
+    python cli.py maintenance
+
+"""
+
+COLLECTION_FIELDS = ('id', 'name', 'cover_image', 'folder_path', 'creation_date', 'tags')
+
+def _write_collections(rows, output_format, out=sys.stdout):
+    """
+    Writes collections one line at a time, as tab-separated values or JSON lines.
+
+    Returns:
+        int: The number of collections written.
+    """
+    count = 0
+    for row in rows:
+        if output_format == 'json':
+            out.write(json.dumps(dict(zip(COLLECTION_FIELDS, row)), ensure_ascii=False))
+        else:
+            out.write("\t".join("" if value is None else str(value) for value in row))
+        out.write("\n")
+        count += 1
+    out.flush()
+    return count
+
+def cmd_list(args):
+    """
+    Lists the collections, optionally filtered by text, tag or health status.
+    """
+    rows = iter_collections(query=args.query, tag=args.tag, broken_only=args.broken)
+    if args.ids_only:
+        for row in rows:
+            print(row[0])
+        return 0
+    _write_collections(rows, args.format)
+    return 0
+
+def cmd_tags(args):
+    """
+    Lists every tag name.
+    """
+    for tag_name in get_all_tags():
+        print(tag_name)
+    return 0
+
+def cmd_add(args):
+    """
+    Adds a single collection.
+    """
+    folder = os.path.abspath(args.folder)
+    cover = os.path.abspath(args.cover) if args.cover else find_first_image_in_folder(folder)
+    collection_id = add_collection_to_db(args.name, folder, cover, args.tags or "")
+    if not collection_id:
+        print("Error saving collection to database.", file=sys.stderr)
+        return 1
+    print(collection_id)
+    return 0
+
+def cmd_import(args):
+    """
+    Adds one collection per subfolder of a directory, named after the subfolder,
+    using the first image found in it as the cover.
+    """
+    directory = os.path.abspath(args.directory)
+    if not os.path.isdir(directory):
+        print(f"Error: Folder path is invalid or does not exist: {directory}", file=sys.stderr)
+        return 1
+
+    existing_folders = {row[3] for row in iter_collections()} if args.skip_existing else set()
+    new_collections = []
+    with os.scandir(directory) as entries:
+        for entry in sorted(entries, key=lambda e: e.name.lower()):
+            if not entry.is_dir() or entry.path in existing_folders:
+                continue
+            new_collections.append((entry.name, entry.path, find_first_image_in_folder(entry.path), args.tags or ""))
+
+    collection_ids = add_collections_bulk(new_collections)
+    if new_collections and not collection_ids:
+        print("Error saving collections to database.", file=sys.stderr)
+        return 1
+    print(f"Imported {len(collection_ids)} collections.")
+    return 0
+
+def cmd_tag(args):
+    """
+    Adds tags to the given collection IDs and/or to every collection matching a filter.
+    Unknown collection IDs are reported and skipped.
+    """
+    collection_ids = set(args.ids)
+    unknown_ids = collection_ids - get_existing_collection_ids(collection_ids)
+    if unknown_ids:
+        print(f"Unknown collection IDs: {', '.join(str(cid) for cid in sorted(unknown_ids))}", file=sys.stderr)
+        collection_ids -= unknown_ids
+    if args.query or args.with_tag or args.broken:
+        collection_ids.update(row[0] for row in iter_collections(query=args.query, tag=args.with_tag, broken_only=args.broken))
+    added = tag_collections(sorted(collection_ids), args.tags)
+    print(f"Added {added} tag links to {len(collection_ids)} collections.")
+    return 0 if not unknown_ids else 1
+
+def cmd_check(args):
+    """
+    Runs the library health check and prints the status of each checked collection.
+    """
+    def on_result(collection_id, status):
+        if status != 'ok' or args.verbose:
+            print(f"{collection_id}\t{status}")
+
+    statuses = run_health_check(max_workers=args.workers, path_timeout=args.timeout,
+                                max_age_seconds=None if args.force else DEFAULT_MAX_AGE,
+                                on_result=on_result)
+    broken = sum(1 for status in statuses.values() if status != 'ok')
+    print(f"Checked {len(statuses)} collections, {broken} broken.", file=sys.stderr)
+    return 0
+
+def cmd_reindex(args):
+    """
+    Rebuilds the database indexes and the tag IDs stored on each collection.
+    """
+    reindex_database()
+    print("Database reindexed.")
+    return 0
+
+def cmd_thumbnails(args):
+    """
+    Generates the missing cover thumbnails so the interface does not decode full-size images.
+    """
+    if thumbnails.Image is None:
+        print("Pillow is not installed: cannot generate thumbnails.", file=sys.stderr)
+        return 1
+    covers = (row[2] for row in iter_collections(query=args.query, tag=args.tag))
+    generated = failed = 0
+    for image_path, thumbnail_path in prewarm_thumbnails(covers, max_workers=args.workers):
+        if thumbnail_path:
+            generated += 1
+        else:
+            failed += 1
+            print(f"Failed: {image_path}", file=sys.stderr)
+    print(f"{generated} thumbnails ready, {failed} failed.")
+    return 0 if not failed else 1
+
+def _parse_color(value, presets):
+    """
+    Parses a colour given as a preset name (e.g. 'Blue') or as '#rrggbb'.
+
+    Returns:
+        tuple or None: The (R, G, B) colour, or None if it cannot be parsed.
+    """
+    for name, rgb in presets.items():
+        if name.lower() == value.lower():
+            return rgb
+    hex_value = value.lstrip('#')
+    if len(hex_value) != 6:
+        return None
+    try:
+        return tuple(int(hex_value[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        return None
+
+def cmd_colors(args):
+    """
+    Extracts the missing cover palettes, or lists the collections closest to a colour.
+    """
+    try:
+        from colors import ColorIndex, COLOR_PRESETS, extract_missing_palettes # NumPy is only needed by this command
+    except ImportError as e:
+        print(f"Colour features are unavailable: {e}", file=sys.stderr)
+        return 1
+
+    if not args.search:
+        extracted = extract_missing_palettes(max_workers=args.workers,
+                                             on_progress=lambda done, total: print(f"{done}/{total}", file=sys.stderr))
+        print(f"Extracted {extracted} palettes.")
+        return 0
+
+    rgb = _parse_color(args.search, COLOR_PRESETS)
+    if rgb is None:
+        print(f"Unknown colour: {args.search} (use a preset name or #rrggbb)", file=sys.stderr)
+        return 1
+    ranked_ids = ColorIndex().load().search(rgb, max_distance=args.max_distance, limit=args.limit)
+    rows = {row[0]: row for row in iter_collections()} if ranked_ids else {}
+    _write_collections((rows[coll_id] for coll_id in ranked_ids if coll_id in rows), args.format)
+    return 0
+
+def cmd_maintenance(args):
+    """
+    Runs VACUUM and/or ANALYZE on the database file.
+    """
+    vacuum = not args.analyze_only
+    analyze = not args.vacuum_only
+    optimize_database(vacuum=vacuum, analyze=analyze)
+    print("Database maintenance done.")
+    return 0
+
+def build_parser():
+    """
+    Builds the argument parser with one subcommand per batch operation.
+    """
+    parser = argparse.ArgumentParser(description="Headless batch operations on the Visual Collection database.")
+    parser.add_argument('--db', default=database.DATABASE_NAME, help="Path to the SQLite database file.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = subparsers.add_parser('list', help="List collections.")
+    list_parser.add_argument('--query', help="Only collections whose name or folder contains this text.")
+    list_parser.add_argument('--tag', help="Only collections that have this tag.")
+    list_parser.add_argument('--broken', action='store_true', help="Only collections flagged by the last health check.")
+    list_parser.add_argument('--format', choices=('tsv', 'json'), default='tsv', help="Output format (default: tsv).")
+    list_parser.add_argument('--ids-only', action='store_true', help="Only print collection IDs.")
+    list_parser.set_defaults(func=cmd_list)
+
+    tags_parser = subparsers.add_parser('tags', help="List every tag.")
+    tags_parser.set_defaults(func=cmd_tags)
+
+    add_parser = subparsers.add_parser('add', help="Add a collection.")
+    add_parser.add_argument('name')
+    add_parser.add_argument('folder')
+    add_parser.add_argument('--cover', help="Cover image (default: first image in the folder).")
+    add_parser.add_argument('--tags', help="Comma-separated tags.")
+    add_parser.set_defaults(func=cmd_add)
+
+    import_parser = subparsers.add_parser('import', help="Add one collection per subfolder of a directory.")
+    import_parser.add_argument('directory')
+    import_parser.add_argument('--tags', help="Comma-separated tags given to every imported collection.")
+    import_parser.add_argument('--skip-existing', action='store_true', help="Skip folders that already are collections.")
+    import_parser.set_defaults(func=cmd_import)
+
+    tag_parser = subparsers.add_parser('tag', help="Add tags to many collections.")
+    tag_parser.add_argument('ids', nargs='*', type=int, help="Collection IDs.")
+    tag_parser.add_argument('--tags', required=True, help="Comma-separated tags to add.")
+    tag_parser.add_argument('--query', help="Also tag collections whose name or folder contains this text.")
+    tag_parser.add_argument('--with-tag', help="Also tag collections that have this tag.")
+    tag_parser.add_argument('--broken', action='store_true', help="Also tag collections flagged by the last health check.")
+    tag_parser.set_defaults(func=cmd_tag)
+
+    check_parser = subparsers.add_parser('check', help="Verify collection folders and cover images.")
+    check_parser.add_argument('--force', action='store_true', help="Also check collections verified recently.")
+    check_parser.add_argument('--workers', type=int, default=8, help="Number of threads (default: 8).")
+    check_parser.add_argument('--timeout', type=float, default=2.0, help="Seconds allowed per path (default: 2).")
+    check_parser.add_argument('--verbose', action='store_true', help="Also print collections that are ok.")
+    check_parser.set_defaults(func=cmd_check)
+
+    reindex_parser = subparsers.add_parser('reindex', help="Rebuild indexes and collection tag IDs.")
+    reindex_parser.set_defaults(func=cmd_reindex)
+
+    thumbnails_parser = subparsers.add_parser('thumbnails', help="Pre-generate cover thumbnails.")
+    thumbnails_parser.add_argument('--query', help="Only collections whose name or folder contains this text.")
+    thumbnails_parser.add_argument('--tag', help="Only collections that have this tag.")
+    thumbnails_parser.add_argument('--workers', type=int, default=4, help="Number of threads (default: 4).")
+    thumbnails_parser.set_defaults(func=cmd_thumbnails)
+
+    colors_parser = subparsers.add_parser('colors', help="Extract cover palettes, or search collections by colour.")
+    colors_parser.add_argument('--search', help="Colour preset name (e.g. Blue) or #rrggbb.")
+    colors_parser.add_argument('--max-distance', type=float, default=30.0, help="Maximum CIELAB distance (default: 30).")
+    colors_parser.add_argument('--limit', type=int, help="Maximum number of results.")
+    colors_parser.add_argument('--format', choices=('tsv', 'json'), default='tsv', help="Output format (default: tsv).")
+    colors_parser.add_argument('--workers', type=int, help="Number of processes (default: one per CPU).")
+    colors_parser.set_defaults(func=cmd_colors)
+
+    maintenance_parser = subparsers.add_parser('maintenance', help="Run VACUUM and ANALYZE on the database.")
+    maintenance_group = maintenance_parser.add_mutually_exclusive_group()
+    maintenance_group.add_argument('--vacuum-only', action='store_true')
+    maintenance_group.add_argument('--analyze-only', action='store_true')
+    maintenance_parser.set_defaults(func=cmd_maintenance)
+
+    return parser
+
+def main(argv=None):
+    """
+    Entry point of the command-line interface.
+
+    Returns:
+        int: The process exit code.
+    """
+    args = build_parser().parse_args(argv)
+    database.DATABASE_NAME = args.db
+    initialize_database()
+    try:
+        return args.func(args)
+    except BrokenPipeError: # e.g. piped into 'head'
+        return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,249 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    from PIL import Image
+except ImportError: # Pillow is only needed to extract palettes, not to search them
+    Image = None
+
+from database import get_covers_without_palette, save_palettes, get_all_palettes
+
+PALETTE_SIZE = 5 # Colours kept per image
+SAMPLE_SIZE = 64 # Images are downsampled to SAMPLE_SIZE x SAMPLE_SIZE pixels before quantization
+QUANTIZATION_BITS = 3 # Bits kept per channel: 8 levels per channel, 512 colour bins
+BATCH_SIZE = 32 # Images processed together by one worker process
+MIN_WEIGHT = 0.05 # Palette colours covering less of the image than this are ignored by searches
+DEFAULT_MAX_DISTANCE = 30.0 # Maximum CIELAB distance for a colour to count as a match
+
+"""
+Dominant colours
+
+Each cover image is downsampled and its pixels quantized into 512 colour bins.
+The PALETTE_SIZE most populated bins form its palette, stored in CollectionColors as
+PALETTE_SIZE * 4 bytes: R, G, B and the share of the image covered (0-255), most present colour first.
+
+| collection_id | source_image        | palette                                  |
+| ------------- | ------------------- | ---------------------------------------- |
+| 1             | /images/coverA.jpg  | 20 bytes: (R, G, B, weight) x 5          |
+
+"""
+
+COLOR_PRESETS = {
+    'Red': (210, 40, 40),
+    'Orange': (235, 130, 30),
+    'Yellow': (235, 210, 50),
+    'Green': (60, 160, 70),
+    'Cyan': (50, 190, 200),
+    'Blue': (40, 80, 200),
+    'Purple': (130, 60, 170),
+    'Pink': (230, 120, 170),
+    'Brown': (120, 80, 45),
+    'Black': (15, 15, 15),
+    'Gray': (128, 128, 128),
+    'White': (245, 245, 245),
+}
+
+_SHIFT = 8 - QUANTIZATION_BITS
+_BINS = 1 << (3 * QUANTIZATION_BITS)
+
+def _load_pixels(image_path):
+    """
+    Loads an image downsampled to SAMPLE_SIZE x SAMPLE_SIZE RGB pixels.
+
+    Returns:
+        numpy.ndarray or None: A (SAMPLE_SIZE * SAMPLE_SIZE, 3) uint8 array, or None if the image cannot be read.
+    """
+    try:
+        with Image.open(image_path) as img:
+            img.draft('RGB', (SAMPLE_SIZE, SAMPLE_SIZE)) # Lets JPEG decoding skip most of the full-size work
+            img = img.convert('RGB').resize((SAMPLE_SIZE, SAMPLE_SIZE), Image.BILINEAR)
+            return np.asarray(img, dtype=np.uint8).reshape(-1, 3)
+    except (OSError, ValueError) as e:
+        print(f"Error reading image {image_path}: {e}")
+        return None
+
+def extract_palettes(pixels):
+    """
+    Computes the palette of many images at once.
+
+    Args:
+        pixels (numpy.ndarray): A (images, pixels, 3) uint8 array.
+
+    Returns:
+        numpy.ndarray: A (images, PALETTE_SIZE, 4) uint8 array of (R, G, B, weight),
+        most present colour first; unused entries have a weight of 0.
+    """
+    count, per_image, _ = pixels.shape
+    quantized = (pixels >> _SHIFT).astype(np.int64)
+    bins = (quantized[..., 0] << (2 * QUANTIZATION_BITS)) | (quantized[..., 1] << QUANTIZATION_BITS) | quantized[..., 2]
+    bins += np.arange(count)[:, None] * _BINS # One set of bins per image, so a single bincount covers the batch
+    bins = bins.ravel()
+
+    counts = np.bincount(bins, minlength=count * _BINS).reshape(count, _BINS)
+    flat_pixels = pixels.reshape(-1, 3).astype(np.float64)
+    sums = np.stack([np.bincount(bins, weights=flat_pixels[:, channel], minlength=count * _BINS)
+                     for channel in range(3)], axis=-1).reshape(count, _BINS, 3)
+
+    top = np.argsort(-counts, axis=1, kind='stable')[:, :PALETTE_SIZE]
+    top_counts = np.take_along_axis(counts, top, axis=1)
+    top_sums = np.take_along_axis(sums, top[..., None], axis=1)
+    means = top_sums / np.maximum(top_counts, 1)[..., None] # Average colour of the pixels in each bin
+
+    palettes = np.zeros((count, PALETTE_SIZE, 4), dtype=np.uint8)
+    palettes[..., :3] = np.clip(np.rint(means), 0, 255)
+    palettes[..., 3] = np.rint(top_counts * 255 / per_image)
+    return palettes
+
+def _palettes_for_batch(image_paths):
+    """
+    Worker executed in the process pool: extracts the palettes of a batch of images.
+
+    Returns:
+        list: The palette bytes of each image, or None for images that could not be read.
+    """
+    loaded = [_load_pixels(path) for path in image_paths]
+    valid = [pixels for pixels in loaded if pixels is not None]
+    if not valid:
+        return [None] * len(image_paths)
+    palettes = iter(extract_palettes(np.stack(valid)))
+    return [next(palettes).tobytes() if pixels is not None else None for pixels in loaded]
+
+def extract_missing_palettes(max_workers=None, on_progress=None):
+    """
+    Extracts the palette of every cover image that does not have one yet, in batches across a process pool.
+
+    Args:
+        max_workers (int or None): The number of worker processes (default: one per CPU).
+        on_progress (callable): Optional callback called with (done, total) after each batch.
+
+    Returns:
+        int: The number of palettes extracted.
+    """
+    if Image is None:
+        print("Pillow is not installed: cannot extract colour palettes.")
+        return 0
+    covers = get_covers_without_palette()
+    if not covers:
+        return 0
+
+    batches = [covers[i:i + BATCH_SIZE] for i in range(0, len(covers), BATCH_SIZE)]
+    extracted = 0
+    done = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        batch_paths = ([path for _, path in batch] for batch in batches)
+        for batch, palettes in zip(batches, executor.map(_palettes_for_batch, batch_paths)):
+            rows = [(coll_id, path, palette) for (coll_id, path), palette in zip(batch, palettes) if palette]
+            save_palettes(rows)
+            extracted += len(rows)
+            done += len(batch)
+            if on_progress:
+                on_progress(done, len(covers))
+    return extracted
+
+def _rgb_to_lab(rgb):
+    """
+    Converts sRGB colours (0-255, last axis of size 3) to CIELAB, where distances follow perceived differences.
+    """
+    c = np.asarray(rgb, dtype=np.float32) / 255.0
+    linear = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = linear @ np.array([[0.4124, 0.3576, 0.1805],
+                             [0.2126, 0.7152, 0.0722],
+                             [0.0193, 0.1192, 0.9505]], dtype=np.float32).T
+    xyz /= np.array([0.95047, 1.0, 1.08883], dtype=np.float32) # D65 white point
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16.0 / 116.0)
+    return np.stack([116.0 * f[..., 1] - 16.0,
+                     500.0 * (f[..., 0] - f[..., 1]),
+                     200.0 * (f[..., 1] - f[..., 2])], axis=-1)
+
+class ColorIndex:
+    """
+    The stored palettes of every collection held as NumPy arrays,
+    so colour searches and hue sorting run vectorized over all collections at once.
+    """
+
+    def __init__(self):
+        self.collection_ids = np.zeros(0, dtype=np.int64)
+        self.lab = np.zeros((0, PALETTE_SIZE, 3), dtype=np.float32)
+        self.weights = np.zeros((0, PALETTE_SIZE), dtype=np.float32)
+        self.hues = np.zeros(0, dtype=np.float32)
+
+    def load(self):
+        """
+        Loads every stored palette from the database.
+        """
+        rows = [(coll_id, palette) for coll_id, palette in get_all_palettes() if len(palette) == PALETTE_SIZE * 4]
+        self.collection_ids = np.array([coll_id for coll_id, _ in rows], dtype=np.int64)
+        raw = np.frombuffer(b"".join(palette for _, palette in rows), dtype=np.uint8).reshape(-1, PALETTE_SIZE, 4)
+        self.lab = _rgb_to_lab(raw[..., :3])
+        self.weights = raw[..., 3].astype(np.float32) / 255.0
+        self.hues = self._dominant_hues(raw[..., :3])
+        return self
+
+    @staticmethod
+    def _dominant_hues(rgb):
+        """
+        Returns the hue (0-1) of the most present saturated colour of each palette,
+        or a value above 1 for palettes with no saturated colour, so they sort last.
+        """
+        c = rgb.astype(np.float32) / 255.0
+        high = c.max(axis=-1)
+        low = c.min(axis=-1)
+        chroma = high - low
+        safe = np.where(chroma > 0, chroma, 1.0)
+        r, g, b = c[..., 0], c[..., 1], c[..., 2]
+        hue = np.where(high == r, ((g - b) / safe) % 6.0,
+              np.where(high == g, (b - r) / safe + 2.0, (r - g) / safe + 4.0)) / 6.0
+
+        saturated = chroma > 0.15
+        first = np.argmax(saturated, axis=1) # Palettes are ordered by weight, so this is the most present one
+        dominant = np.take_along_axis(hue, first[:, None], axis=1)[:, 0]
+        return np.where(saturated.any(axis=1), dominant, 2.0).astype(np.float32)
+
+    def search(self, rgb, max_distance=DEFAULT_MAX_DISTANCE, limit=None):
+        """
+        Finds the collections whose palette contains a colour close to 'rgb'.
+
+        Args:
+            rgb (tuple): The (R, G, B) colour to look for, 0-255.
+            max_distance (float): The maximum CIELAB distance for a palette colour to match.
+            limit (int or None): The maximum number of results.
+
+        Returns:
+            list: Collection IDs, closest match first.
+        """
+        if not len(self.collection_ids):
+            return []
+        target = _rgb_to_lab(np.array(rgb, dtype=np.float32))
+        distances = np.linalg.norm(self.lab - target, axis=-1)
+        distances[self.weights < MIN_WEIGHT] = np.inf
+        best = distances.min(axis=1)
+
+        matches = np.flatnonzero(best <= max_distance)
+        if limit is not None and len(matches) > limit:
+            matches = matches[np.argpartition(best[matches], limit)[:limit]]
+        matches = matches[np.argsort(best[matches], kind='stable')]
+        return self.collection_ids[matches].tolist()
+
+    def sort_by_hue(self, collection_ids):
+        """
+        Orders collection IDs by the hue of their dominant colour.
+        Collections without a palette or without a saturated colour come last, in their original order.
+
+        Args:
+            collection_ids (list): The collection IDs to order.
+
+        Returns:
+            list: The same IDs, ordered by hue.
+        """
+        hue_by_id = dict(zip(self.collection_ids.tolist(), self.hues.tolist()))
+        keys = np.array([hue_by_id.get(coll_id, 3.0) for coll_id in collection_ids], dtype=np.float32)
+        order = np.argsort(keys, kind='stable')
+        return [collection_ids[i] for i in order]
+
+if __name__ == '__main__':
+    """
+    Main execution block to extract the missing palettes when the script is run directly.
+    """
+    extracted = extract_missing_palettes(on_progress=lambda done, total: print(f"{done}/{total}"))
+    print(f"Extracted {extracted} palettes.")
@@ -1,6 +1,7 @@
 import sqlite3
 
 DATABASE_NAME = 'visual_collection.db'
+MAX_QUERY_VARIABLES = 500 # Bound parameters per query, under SQLite's default limit of 999
 
 """
 Collection Database
@@ -29,6 +30,9 @@ def initialize_database():
     - Collections: Stores information about each collection (name, folder path, cover image, etc.).
     - Tags: Stores unique tag names.
     - CollectionTags: A many-to-many relationship table linking collections to tags.
+    - CollectionHealth: The result of the last health check for each collection.
+    - TagCooccurrence: How many collections share each pair of tags, used for tag suggestions.
+    - CollectionColors: The dominant colour palette of each collection's cover image.
     """
     conn = sqlite3.connect(DATABASE_NAME)
     cursor = conn.cursor()
@@ -63,10 +67,161 @@ def initialize_database():
         FOREIGN KEY (tag_id) REFERENCES Tags (tag_id)
     )
     ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_collectiontags_tag ON CollectionTags (tag_id)")
+
+    # Create TagCooccurrence table: number of collections having both tags.
+    # Each pair is stored in both directions; the (tag_id, tag_id) row is the number of collections with that tag.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS TagCooccurrence (
+        tag_id INTEGER NOT NULL,
+        other_tag_id INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (tag_id, other_tag_id),
+        FOREIGN KEY (tag_id) REFERENCES Tags (tag_id),
+        FOREIGN KEY (other_tag_id) REFERENCES Tags (tag_id)
+    )
+    ''')
+    # Create CollectionColors table: dominant colours of each cover image, packed as bytes
+    # (see colors.py for the layout), with the path they were extracted from.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS CollectionColors (
+        collection_id INTEGER PRIMARY KEY,
+        source_image TEXT NOT NULL,
+        palette BLOB NOT NULL,
+        FOREIGN KEY (collection_id) REFERENCES Collections (id)
+    )
+    ''')
+
+    # Databases created before the index existed: build it once from CollectionTags
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM TagCooccurrence), EXISTS (SELECT 1 FROM CollectionTags)")
+    has_cooccurrence, has_links = cursor.fetchone()
+    if has_links and not has_cooccurrence:
+        _rebuild_tag_cooccurrence(cursor)
+
+    # Create CollectionHealth table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS CollectionHealth (
+        collection_id INTEGER PRIMARY KEY,
+        folder_ok INTEGER NOT NULL,
+        cover_ok INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (collection_id) REFERENCES Collections (id)
+    )
+    ''')
 
     conn.commit()
     conn.close()
 
+def _split_tags(tags):
+    """
+    Normalizes tags given either as a comma-separated string or as a list of names.
+
+    Returns:
+        list: The stripped, non-empty tag names, without duplicates, in their original order.
+    """
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    tag_names = []
+    for tag in tags:
+        tag = tag.strip()
+        if tag and tag not in tag_names:
+            tag_names.append(tag)
+    return tag_names
+
+def _get_or_create_tag_ids(cursor, tag_names):
+    """
+    Returns the IDs of the given tags, creating the tags that do not exist yet.
+    """
+    tag_ids = []
+    for tag_name in tag_names:
+        # Check if tag exists
+        cursor.execute("SELECT tag_id FROM Tags WHERE nom_tag = ?", (tag_name,))
+        tag_row = cursor.fetchone()
+        if tag_row:
+            tag_id = tag_row[0]
+        else:
+            # Add new tag
+            cursor.execute("INSERT INTO Tags (nom_tag) VALUES (?)", (tag_name,))
+            tag_id = cursor.lastrowid
+        if tag_id:
+            tag_ids.append(tag_id)
+    return tag_ids
+
+def _update_tag_cooccurrence(cursor, existing_tag_ids, new_tag_ids):
+    """
+    Incrementally updates TagCooccurrence when 'new_tag_ids' are linked to a collection
+    that already has 'existing_tag_ids'.
+    """
+    pairs = []
+    for i, tag_id in enumerate(new_tag_ids):
+        pairs.append((tag_id, tag_id))
+        for other_tag_id in list(existing_tag_ids) + list(new_tag_ids[:i]):
+            pairs.append((tag_id, other_tag_id))
+            pairs.append((other_tag_id, tag_id))
+    cursor.executemany('''
+    INSERT INTO TagCooccurrence (tag_id, other_tag_id, count) VALUES (?, ?, 1)
+    ON CONFLICT (tag_id, other_tag_id) DO UPDATE SET count = count + 1
+    ''', pairs)
+
+def _rebuild_tag_cooccurrence(cursor):
+    """
+    Recomputes the whole TagCooccurrence table from CollectionTags.
+    """
+    cursor.execute("DELETE FROM TagCooccurrence")
+    cursor.execute('''
+    INSERT INTO TagCooccurrence (tag_id, other_tag_id, count)
+    SELECT a.tag_id, b.tag_id, COUNT(*)
+    FROM CollectionTags a
+    JOIN CollectionTags b ON a.collection_id = b.collection_id
+    GROUP BY a.tag_id, b.tag_id
+    ''')
+
+def get_tag_cooccurrence():
+    """
+    Retrieves the tag co-occurrence index along with every tag name.
+
+    Returns:
+        tuple: (tags, pairs) where 'tags' is a list of (tag_id, name) tuples
+        and 'pairs' a list of (tag_id, other_tag_id, count) tuples.
+    """
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    cursor.execute("SELECT tag_id, nom_tag FROM Tags")
+    tags = cursor.fetchall()
+    cursor.execute("SELECT tag_id, other_tag_id, count FROM TagCooccurrence")
+    pairs = cursor.fetchall()
+    conn.close()
+    return tags, pairs
+
+def _insert_collection(cursor, nom, chemin_dossier, image_couverture, tags):
+    """
+    Inserts a collection and its CollectionTags links using an open cursor.
+
+    Returns:
+        int: The ID of the newly created collection.
+    """
+    # 1. Add/Get Tags and their IDs
+    processed_tag_ids = _get_or_create_tag_ids(cursor, _split_tags(tags))
+
+    # 2. Insert the Collection with comma-separated tag IDs
+    tags_ids_string = ",".join(str(tag_id) for tag_id in processed_tag_ids)
+    cursor.execute('''
+    INSERT INTO Collections (nom, chemin_dossier, image_couverture, tags)
+    VALUES (?, ?, ?, ?)
+    ''', (nom, chemin_dossier, image_couverture, tags_ids_string))
+    collection_id = cursor.lastrowid
+
+    # 3. Insert CollectionTags
+    cursor.executemany("INSERT INTO CollectionTags (collection_id, tag_id) VALUES (?, ?)",
+                       [(collection_id, tag_id) for tag_id in processed_tag_ids])
+
+    # 4. Keep the tag co-occurrence index up to date
+    _update_tag_cooccurrence(cursor, [], processed_tag_ids)
+    return collection_id
+
 def add_collection_to_db(nom, chemin_dossier, image_couverture, tags_str):
     """
     Adds a new collection to the database along with its associated tags.
@@ -75,7 +230,7 @@ def add_collection_to_db(nom, chemin_dossier, image_couverture, tags_str):
         nom (str): The name of the collection.
         chemin_dossier (str): The file system path to the collection's folder.
         image_couverture (str): The file system path to the collection's cover image.
-        tags_str (str): A comma-separated string of tags associated with the collection.
+        tags_str (str or list): A comma-separated string (or a list) of tags associated with the collection.
         Tags that do not exist will be created.
 
     Returns:
@@ -84,46 +239,129 @@ def add_collection_to_db(nom, chemin_dossier, image_couverture, tags_str):
     conn = sqlite3.connect(DATABASE_NAME)
     cursor = conn.cursor()
     collection_id = None
-    processed_tag_ids = []
 
     try:
-        # 1. Add/Get Tags and their IDs
-        if tags_str:
-            tag_names = [tag.strip() for tag in tags_str.split(',') if tag.strip()]
-            for tag_name in tag_names:
-                # Check if tag exists
-                cursor.execute("SELECT tag_id FROM Tags WHERE nom_tag = ?", (tag_name,))
-                tag_row = cursor.fetchone()
-                if tag_row:
-                    tag_id = tag_row[0]
-                else:
-                    # Add new tag
-                    cursor.execute("INSERT INTO Tags (nom_tag) VALUES (?)", (tag_name,))
-                    tag_id = cursor.lastrowid
-                if tag_id:
-                    processed_tag_ids.append(str(tag_id)) # Store as string for joining
-
-        # 2. Insert the Collection with comma-separated tag IDs
-        tags_ids_string = ",".join(processed_tag_ids)
-        cursor.execute('''
-        INSERT INTO Collections (nom, chemin_dossier, image_couverture, tags)
-        VALUES (?, ?, ?, ?)
-        ''', (nom, chemin_dossier, image_couverture, tags_ids_string))
-        collection_id = cursor.lastrowid
-
-        # 3. Insert CollectionTags
-        for tag_id in processed_tag_ids:
-            cursor.execute("INSERT INTO CollectionTags (collection_id, tag_id) VALUES (?, ?)", (collection_id, tag_id))
-
+        collection_id = _insert_collection(cursor, nom, chemin_dossier, image_couverture, tags_str)
         conn.commit()
     except sqlite3.Error as e:
         print(f"Database error: {e}")
         conn.rollback() # Rollback changes on error
+        collection_id = None
     finally:
         conn.close()
 
     return collection_id
 
+def add_collections_bulk(collections):
+    """
+    Adds many collections in a single transaction.
+
+    Args:
+        collections (iterable): Tuples (name, folder_path, cover_image_path, tags),
+        where tags is a comma-separated string or a list of tag names.
+
+    Returns:
+        list: The IDs of the newly created collections, or an empty list if the transaction failed.
+    """
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    collection_ids = []
+    try:
+        for nom, chemin_dossier, image_couverture, tags in collections:
+            collection_ids.append(_insert_collection(cursor, nom, chemin_dossier, image_couverture, tags))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        conn.rollback()
+        collection_ids = []
+    finally:
+        conn.close()
+    return collection_ids
+
+def _sync_collection_tag_ids(cursor, collection_ids=None):
+    """
+    Rebuilds the comma-separated 'tags' column of Collections from CollectionTags.
+    If 'collection_ids' is None, every collection is rebuilt.
+    """
+    query = '''
+    UPDATE Collections
+    SET tags = COALESCE((SELECT GROUP_CONCAT(tag_id) FROM CollectionTags WHERE collection_id = Collections.id), '')
+    '''
+    if collection_ids is None:
+        cursor.execute(query)
+    else:
+        cursor.executemany(query + " WHERE id = ?", [(cid,) for cid in collection_ids])
+
+def _existing_collection_ids(cursor, collection_ids):
+    """
+    Returns the subset of the given collection IDs that exist in the Collections table, using an open cursor.
+    """
+    collection_ids = list(collection_ids)
+    existing = set()
+    for i in range(0, len(collection_ids), MAX_QUERY_VARIABLES):
+        chunk = collection_ids[i:i + MAX_QUERY_VARIABLES]
+        cursor.execute(f"SELECT id FROM Collections WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+        existing.update(row[0] for row in cursor.fetchall())
+    return existing
+
+def get_existing_collection_ids(collection_ids):
+    """
+    Checks which collection IDs exist in the database.
+
+    Args:
+        collection_ids (iterable): The collection IDs to check.
+
+    Returns:
+        set: The IDs that belong to an existing collection.
+    """
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    existing = _existing_collection_ids(cursor, collection_ids)
+    conn.close()
+    return existing
+
+def tag_collections(collection_ids, tags):
+    """
+    Adds tags to many collections at once. Tags that do not exist will be created,
+    and tags a collection already has are left untouched.
+    IDs that do not belong to an existing collection are ignored.
+
+    Args:
+        collection_ids (iterable): The IDs of the collections to tag.
+        tags (str or list): A comma-separated string (or a list) of tag names.
+
+    Returns:
+        int: The number of new collection/tag links created.
+    """
+    collection_ids = list(collection_ids)
+    tag_names = _split_tags(tags)
+    if not collection_ids or not tag_names:
+        return 0
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    added = 0
+    try:
+        existing_ids = _existing_collection_ids(cursor, collection_ids)
+        collection_ids = [cid for cid in collection_ids if cid in existing_ids]
+        tag_ids = _get_or_create_tag_ids(cursor, tag_names) if collection_ids else []
+        for cid in collection_ids:
+            cursor.execute("SELECT tag_id FROM CollectionTags WHERE collection_id = ?", (cid,))
+            existing_tag_ids = [row[0] for row in cursor.fetchall()]
+            new_tag_ids = [tag_id for tag_id in tag_ids if tag_id not in existing_tag_ids]
+            cursor.executemany("INSERT INTO CollectionTags (collection_id, tag_id) VALUES (?, ?)",
+                               [(cid, tag_id) for tag_id in new_tag_ids])
+            _update_tag_cooccurrence(cursor, existing_tag_ids, new_tag_ids)
+            added += len(new_tag_ids)
+        _sync_collection_tag_ids(cursor, collection_ids)
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        conn.rollback()
+        added = 0
+    finally:
+        conn.close()
+    return added
+
 def get_all_tags():
     """
     Retrieves all unique tag names from the Tags table, ordered alphabetically.
@@ -131,7 +369,7 @@ def get_all_tags():
     Returns:
         list: A list of strings, where each string is a tag name.
     """
-    conn = sqlite3.connect('visual_collection.db')
+    conn = sqlite3.connect(DATABASE_NAME)
     cursor = conn.cursor()
     cursor.execute("SELECT nom_tag FROM Tags ORDER BY nom_tag")
     tags = [row[0] for row in cursor.fetchall()]
@@ -148,7 +386,7 @@ def add_new_tag(nom_tag):
     Returns:
         bool: True if the tag was successfully added, False if the tag already exists or an error occurred.
     """
-    conn = sqlite3.connect('visual_collection.db')
+    conn = sqlite3.connect(DATABASE_NAME)
     cursor = conn.cursor()
     try:
         # Check if tag already exists (case-insensitive check recommended for tags)
@@ -183,7 +421,7 @@ def get_all_collections():
         list: A list of tuples. Each tuple represents a collection and contains:
             (id, name, cover_image_path, folder_path, concatenated_tags_string or None)
     """
-    conn = sqlite3.connect('visual_collection.db')
+    conn = sqlite3.connect(DATABASE_NAME)
     cursor = conn.cursor()
     query = """
     SELECT
@@ -208,6 +446,310 @@ def get_all_collections():
     conn.close()
     return collections
 
+def get_collections_to_check(max_age_seconds=None):
+    """
+    Retrieves the collections whose folder and cover image should be verified.
+    Collections checked less than 'max_age_seconds' ago are skipped,
+    except those whose last check timed out, since their paths were never verified.
+
+    Args:
+        max_age_seconds (int or None): Skip collections verified more recently than this.
+        If None, every collection is returned.
+
+    Returns:
+        list: A list of tuples (id, folder_path, cover_image_path).
+    """
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    if max_age_seconds is None:
+        cursor.execute("SELECT id, chemin_dossier, image_couverture FROM Collections")
+    else:
+        cursor.execute('''
+        SELECT c.id, c.chemin_dossier, c.image_couverture
+        FROM Collections c
+        LEFT JOIN CollectionHealth h ON c.id = h.collection_id
+        WHERE h.checked_at IS NULL OR h.checked_at < datetime('now', ?) OR h.status = 'timeout'
+        ''', (f"-{int(max_age_seconds)} seconds",))
+    collections = cursor.fetchall()
+    conn.close()
+    return collections
+
+def save_health_results(results):
+    """
+    Stores the results of a health check, stamping each row with the current time.
+
+    Args:
+        results (list): A list of tuples (collection_id, folder_ok, cover_ok, status).
+    """
+    if not results:
+        return
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.executemany('''
+        INSERT OR REPLACE INTO CollectionHealth (collection_id, folder_ok, cover_ok, status, checked_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', [(cid, int(folder_ok), int(cover_ok), status) for cid, folder_ok, cover_ok, status in results])
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+def get_broken_collection_ids():
+    """
+    Retrieves the IDs of collections whose last health check did not pass.
+
+    Returns:
+        set: The IDs of the broken collections.
+    """
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    cursor.execute("SELECT collection_id FROM CollectionHealth WHERE status != 'ok'")
+    broken_ids = {row[0] for row in cursor.fetchall()}
+    conn.close()
+    return broken_ids
+
+def relocate_collections(collection_ids, old_prefix, new_prefix):
+    """
+    Rewrites the folder and cover image paths of the given collections,
+    replacing 'old_prefix' with 'new_prefix' (e.g. after a drive letter or mount point changed).
+    The health status of the updated collections is reset so the next check verifies them again.
+
+    Args:
+        collection_ids (iterable): The IDs of the collections to update.
+        old_prefix (str): The path prefix to replace.
+        new_prefix (str): The replacement path prefix.
+
+    Returns:
+        int: The number of collections updated.
+    """
+    collection_ids = list(collection_ids)
+    if not collection_ids or not old_prefix:
+        return 0
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    updated_ids = []
+    try:
+        # Only the collections with a path under 'old_prefix' are rewritten and have their health reset
+        for cid in collection_ids:
+            cursor.execute('''
+            SELECT 1 FROM Collections
+            WHERE id = ? AND (substr(chemin_dossier, 1, ?) = ? OR substr(image_couverture, 1, ?) = ?)
+            ''', (cid, len(old_prefix), old_prefix, len(old_prefix), old_prefix))
+            if cursor.fetchone():
+                updated_ids.append(cid)
+        for field in ('chemin_dossier', 'image_couverture'):
+            cursor.executemany(f'''
+            UPDATE Collections
+            SET {field} = ? || substr({field}, ?)
+            WHERE id = ? AND substr({field}, 1, ?) = ?
+            ''', [(new_prefix, len(old_prefix) + 1, cid, len(old_prefix), old_prefix) for cid in updated_ids])
+        cursor.executemany("DELETE FROM CollectionHealth WHERE collection_id = ?", [(cid,) for cid in updated_ids])
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        conn.rollback()
+        updated_ids = []
+    finally:
+        conn.close()
+    return len(updated_ids)
+
+def clear_missing_covers(collection_ids):
+    """
+    Removes the cover image of the given collections whose last health check found the cover missing,
+    so the cards show the placeholder image instead of a broken path.
+
+    Args:
+        collection_ids (iterable): The IDs of the collections to update.
+
+    Returns:
+        int: The number of collections updated.
+    """
+    collection_ids = list(collection_ids)
+    if not collection_ids:
+        return 0
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    updated = 0
+    try:
+        cursor.executemany('''
+        UPDATE Collections SET image_couverture = NULL
+        WHERE id = ? AND id IN (SELECT collection_id FROM CollectionHealth WHERE cover_ok = 0)
+        ''', [(cid,) for cid in collection_ids])
+        updated = cursor.rowcount
+        cursor.executemany('''
+        UPDATE CollectionHealth
+        SET cover_ok = 1, status = CASE WHEN folder_ok = 1 THEN 'ok' WHEN status = 'timeout' THEN status ELSE 'missing_folder' END
+        WHERE collection_id = ? AND cover_ok = 0
+        ''', [(cid,) for cid in collection_ids])
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        conn.rollback()
+        updated = 0
+    finally:
+        conn.close()
+    return updated
+
+def iter_collections(query=None, tag=None, broken_only=False, batch_size=500):
+    """
+    Streams collections from the database instead of loading them all in memory.
+    Collections are ordered by creation date in descending order.
+
+    Args:
+        query (str): Only yield collections whose name or folder path contains this text (case-insensitive).
+        tag (str): Only yield collections that have this tag.
+        broken_only (bool): Only yield collections flagged by the last health check.
+        batch_size (int): The number of rows fetched from SQLite at a time.
+
+    Yields:
+        tuple: (id, name, cover_image_path, folder_path, creation_date, concatenated_tags_string or None)
+    """
+    conditions = []
+    params = []
+    if query:
+        conditions.append("(c.nom LIKE ? OR c.chemin_dossier LIKE ?)")
+        params += [f"%{query}%", f"%{query}%"]
+    if tag:
+        conditions.append('''c.id IN (
+            SELECT ct2.collection_id FROM CollectionTags ct2
+            JOIN Tags t2 ON ct2.tag_id = t2.tag_id
+            WHERE t2.nom_tag = ?)''')
+        params.append(tag)
+    if broken_only:
+        conditions.append("c.id IN (SELECT collection_id FROM CollectionHealth WHERE status != 'ok')")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    conn = sqlite3.connect(DATABASE_NAME)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+        SELECT
+            c.id,
+            c.nom,
+            c.image_couverture,
+            c.chemin_dossier,
+            c.date_creation,
+            GROUP_CONCAT(t.nom_tag) AS tags_concatenes
+        FROM
+            Collections c
+        LEFT JOIN
+            CollectionTags ct ON c.id = ct.collection_id
+        LEFT JOIN
+            Tags t ON ct.tag_id = t.tag_id
+        {where}
+        GROUP BY
+            c.id
+        ORDER BY
+            c.date_creation DESC
+        ''', params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+def get_covers_without_palette():
+    """
+    Retrieves the collections whose cover image has no colour palette yet,
+    or whose cover image changed since its palette was extracted.
+
+    Returns:
+        list: A list of tuples (id, cover_image_path).
+    """
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    cursor.execute('''
+    SELECT c.id, c.image_couverture
+    FROM Collections c
+    LEFT JOIN CollectionColors cc ON c.id = cc.collection_id
+    WHERE c.image_couverture IS NOT NULL AND c.image_couverture != ''
+        AND (cc.source_image IS NULL OR cc.source_image != c.image_couverture)
+    ''')
+    covers = cursor.fetchall()
+    conn.close()
+    return covers
+
+def save_palettes(palettes):
+    """
+    Stores colour palettes extracted from cover images.
+
+    Args:
+        palettes (list): A list of tuples (collection_id, cover_image_path, palette_bytes).
+    """
+    if not palettes:
+        return
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.executemany('''
+        INSERT OR REPLACE INTO CollectionColors (collection_id, source_image, palette)
+        VALUES (?, ?, ?)
+        ''', palettes)
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+def get_all_palettes():
+    """
+    Retrieves the colour palette of every collection that has one.
+
+    Returns:
+        list: A list of tuples (collection_id, palette_bytes).
+    """
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    cursor.execute("SELECT collection_id, palette FROM CollectionColors")
+    palettes = cursor.fetchall()
+    conn.close()
+    return palettes
+
+def reindex_database():
+    """
+    Rebuilds the SQLite indexes, the comma-separated 'tags' column of every collection
+    and the tag co-occurrence index from the CollectionTags table,
+    after dropping the CollectionTags links of collections that no longer exist.
+    """
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM CollectionTags WHERE collection_id NOT IN (SELECT id FROM Collections)")
+        _sync_collection_tag_ids(cursor)
+        _rebuild_tag_cooccurrence(cursor)
+        conn.commit()
+        cursor.execute("REINDEX")
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+def optimize_database(vacuum=True, analyze=True):
+    """
+    Runs SQLite maintenance on the database file.
+
+    Args:
+        vacuum (bool): Rebuild the database file to reclaim unused space.
+        analyze (bool): Refresh the statistics used by the query planner.
+    """
+    conn = sqlite3.connect(DATABASE_NAME)
+    try:
+        if vacuum:
+            conn.execute("VACUUM")
+        if analyze:
+            conn.execute("ANALYZE")
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+    finally:
+        conn.close()
+
 if __name__ == '__main__':
     """
     Main execution block to initialize the database when the script is run directly.
@@ -0,0 +1,83 @@
+import heapq
+import itertools
+import time
+
+from kivy.clock import Clock
+
+DEFAULT_FRAME_BUDGET = 0.008 # Seconds of work per frame, about half a frame at 60 FPS
+
+class FrameBudgetScheduler:
+    """
+    Runs queued UI tasks spread over several frames, spending at most a fixed amount
+    of wall time per frame, so long jobs (e.g. building thousands of cards) do not freeze the window.
+    Tasks with the lowest priority number run first; tasks with equal priority run in the order they were added.
+    """
+
+    def __init__(self, budget=DEFAULT_FRAME_BUDGET, on_frame=None):
+        """
+        Args:
+            budget (float): The wall time in seconds the scheduler may use per frame.
+            on_frame (callable): Optional callback run once at the end of every frame that ran tasks
+            (e.g. to update what the new widgets show). Its cost is taken out of the next frame's budget.
+        """
+        self.budget = budget
+        self.on_frame = on_frame
+        self._on_frame_cost = 0.0
+        self._tasks = [] # heap of (priority, sequence, callable)
+        self._sequence = itertools.count()
+        self._event = None
+
+    def add(self, task, priority=0):
+        """
+        Queues a task to run on a later frame.
+
+        Args:
+            task (callable): Called without arguments.
+            priority (int): Lower numbers run first.
+        """
+        heapq.heappush(self._tasks, (priority, next(self._sequence), task))
+        if self._event is None:
+            self._event = Clock.schedule_once(self._run, 0)
+
+    def clear(self):
+        """
+        Drops every task not run yet.
+        """
+        self._tasks.clear()
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+    @property
+    def pending(self):
+        """
+        The number of tasks not run yet.
+        """
+        return len(self._tasks)
+
+    def _run(self, dt):
+        """
+        Runs tasks until the frame budget is spent (at least one task per frame),
+        then continues on the next frame if tasks remain.
+        """
+        self._event = None
+        deadline = time.perf_counter() + self.budget - self._on_frame_cost
+        while self._tasks:
+            _, _, task = heapq.heappop(self._tasks)
+            try:
+                task()
+            except Exception as e:
+                print(f"Error in scheduled task: {e}")
+            if time.perf_counter() >= deadline:
+                break
+
+        if self.on_frame:
+            start = time.perf_counter()
+            try:
+                self.on_frame()
+            except Exception as e:
+                print(f"Error in frame callback: {e}")
+            self._on_frame_cost = time.perf_counter() - start
+
+        if self._tasks and self._event is None:
+            self._event = Clock.schedule_once(self._run, 0)
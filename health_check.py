@@ -0,0 +1,173 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from database import get_collections_to_check, save_health_results
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PATH_TIMEOUT = 2.0 # Seconds allowed for a single path before it is reported as 'timeout'
+DEFAULT_MAX_AGE = 24 * 60 * 60 # Collections verified less than a day ago are skipped
+DEFAULT_MAX_PER_ROOT = 2 # Paths of the same drive or mount checked at the same time
+
+"""
+Library Health Check
+
+Verifies that the folder and the cover image of every collection still exist.
+Paths are checked in parallel threads, with a per-drive limit, so a slow network mount only delays its own collections.
+Results are written to the CollectionHealth table:
+
+| collection_id | folder_ok | cover_ok | status         | checked_at          |
+| ------------- | --------- | -------- | -------------- | ------------------- |
+| 1             | 1         | 1        | ok             | 2025-05-07 10:12:00 |
+| 2             | 0         | 1        | missing_folder | 2025-05-07 10:12:00 |
+| 3             | 1         | 0        | missing_cover  | 2025-05-07 10:12:00 |
+| 4             | 0         | 1        | timeout        | 2025-05-07 10:12:02 |
+
+"""
+
+def _path_root(path):
+    """
+    Returns the drive, network share or top-level mount a path lives on (e.g. 'E:\\', '\\\\server\\share'
+    or '/mnt/nas'), so that one unresponsive root cannot take every worker.
+    """
+    drive, rest = os.path.splitdrive(os.path.abspath(path))
+    parts = [part for part in rest.replace('\\', '/').split('/') if part]
+    if drive:
+        return drive
+    return '/' + '/'.join(parts[:2])
+
+def _check_path(key, results):
+    """
+    Body of a worker thread: checks whether a folder or file exists and reports it on the results queue.
+    """
+    path, is_folder = key
+    try:
+        exists = os.path.isdir(path) if is_folder else os.path.isfile(path)
+    except OSError as e:
+        print(f"Error checking path {path}: {e}")
+        exists = False
+    results.put((key, exists))
+
+def _status_for(folder_ok, cover_ok, timed_out):
+    """
+    Derives the status stored in CollectionHealth from the individual checks.
+    """
+    if timed_out:
+        return 'timeout'
+    if not folder_ok and not cover_ok:
+        return 'missing'
+    if not folder_ok:
+        return 'missing_folder'
+    if not cover_ok:
+        return 'missing_cover'
+    return 'ok'
+
+def run_health_check(max_workers=DEFAULT_MAX_WORKERS, path_timeout=DEFAULT_PATH_TIMEOUT,
+                     max_age_seconds=DEFAULT_MAX_AGE, on_result=None, max_per_root=DEFAULT_MAX_PER_ROOT):
+    """
+    Verifies the folder and cover image of every collection that was not checked recently.
+
+    Each path is checked in its own daemon thread, so threads stuck on an unresponsive mount
+    never keep the process alive. At most 'max_per_root' paths of the same drive or mount are checked
+    at once, and once a path of a root times out, the other paths of that root are not checked:
+    their collections are left unsaved so the next run retries them.
+
+    Args:
+        max_workers (int): The maximum number of paths checked at the same time.
+        path_timeout (float): Seconds allowed for a single path check before it is reported as 'timeout'.
+        max_age_seconds (int or None): Skip collections verified more recently than this.
+        If None, every collection is checked. Collections whose last check timed out are always checked again.
+        on_result (callable): Optional callback called with (collection_id, status) for each checked collection.
+        max_per_root (int): The maximum number of paths of the same drive or mount checked at the same time.
+
+    Returns:
+        dict: A mapping of collection ID to its status, for the collections that were fully checked.
+    """
+    collections = get_collections_to_check(max_age_seconds)
+    if not collections:
+        return {}
+
+    # Identical paths (e.g. several collections sharing a folder) are only checked once.
+    path_results = {("", True): False} # A collection without folder path has a missing folder
+    timed_out = set()
+    queues = {} # root -> deque of keys not started yet
+    for coll_id, folder_path, cover_path in collections:
+        keys = [(folder_path or "", True)]
+        if cover_path:
+            keys.append((cover_path, False))
+        for key in keys:
+            if key[0] and key not in path_results:
+                path_results[key] = None # Not checked yet
+                queues.setdefault(_path_root(key[0]), deque()).append(key)
+
+    results = queue.Queue()
+    running = {} # key -> (root, start time)
+    in_flight = {} # root -> number of running checks
+    while running or any(queues.values()):
+        # Start checks, round-robin over the roots that still have a free slot
+        started_one = True
+        while started_one and len(running) < max_workers:
+            started_one = False
+            for root, keys in queues.items():
+                if keys and in_flight.get(root, 0) < max_per_root and len(running) < max_workers:
+                    key = keys.popleft()
+                    running[key] = (root, time.monotonic())
+                    in_flight[root] = in_flight.get(root, 0) + 1
+                    threading.Thread(target=_check_path, args=(key, results), daemon=True).start()
+                    started_one = True
+        if not running:
+            break
+
+        try:
+            key, exists = results.get(timeout=min(path_timeout, 0.25))
+            if key in running:
+                path_results[key] = exists
+                root, _ = running.pop(key)
+                in_flight[root] -= 1
+        except queue.Empty:
+            pass
+
+        now = time.monotonic()
+        for key, (root, start) in list(running.items()):
+            if now - start > path_timeout:
+                # The thread is abandoned (it is a daemon) and the root is given up on for this run.
+                print(f"Health check timed out for path: {key[0]}")
+                timed_out.add(key)
+                del running[key]
+                in_flight[root] -= 1
+                if queues[root]:
+                    print(f"Skipping {len(queues[root])} other paths on unresponsive root: {root}")
+                    queues[root].clear()
+
+    checked = []
+    statuses = {}
+    for coll_id, folder_path, cover_path in collections:
+        folder_key = (folder_path or "", True)
+        cover_key = (cover_path, False)
+        if folder_key in timed_out or cover_key in timed_out:
+            folder_ok = bool(path_results.get(folder_key))
+            cover_ok = bool(path_results.get(cover_key)) if cover_path else True
+            status = 'timeout'
+        else:
+            folder_ok = path_results[folder_key]
+            cover_ok = path_results[cover_key] if cover_path else True
+            if folder_ok is None or cover_ok is None:
+                continue # Never checked: left unsaved so the next run retries it
+            status = _status_for(folder_ok, cover_ok, False)
+        checked.append((coll_id, folder_ok, cover_ok, status))
+        statuses[coll_id] = status
+        if on_result:
+            on_result(coll_id, status)
+
+    save_health_results(checked)
+    return statuses
+
+if __name__ == '__main__':
+    """
+    Main execution block to check every collection when the script is run directly.
+    """
+    statuses = run_health_check(max_age_seconds=None)
+    broken = sum(1 for status in statuses.values() if status != 'ok')
+    print(f"Checked {len(statuses)} collections, {broken} broken.")
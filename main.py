@@ -12,13 +12,24 @@ from kivy.uix.label import Label
 from kivy.graphics import Color, RoundedRectangle
 from kivy.metrics import dp
 from kivy.clock import Clock
-from database import initialize_database, add_collection_to_db, get_all_tags, add_new_tag, get_all_collections
+from database import initialize_database, add_collection_to_db, get_all_tags, add_new_tag, get_all_collections, get_broken_collection_ids, relocate_collections, clear_missing_covers
+from health_check import run_health_check, DEFAULT_MAX_AGE
+from thumbnails import find_first_image_in_folder
+from texture_cache import TextureCache, DEFAULT_BUDGET_BYTES
+from tag_suggestions import TagSuggester
+from colors import ColorIndex, COLOR_PRESETS
+from frame_scheduler import FrameBudgetScheduler, DEFAULT_FRAME_BUDGET
+import math
 import os
 import sys
 import subprocess
+import threading
 
 from kivy.properties import StringProperty, NumericProperty
 
+PLACEHOLDER_IMAGE = "assets/placeholder.png"
+CARD_IMAGE_RADIUS = dp(6)
+
 class CollectionCard(ButtonBehavior, BoxLayout):
     """
     A card widget to display individual collection information,
@@ -30,13 +41,69 @@ class CollectionCard(ButtonBehavior, BoxLayout):
     collection_name = StringProperty("Collection Name")
     collection_tags = StringProperty("")
     folder_path = StringProperty("")
+    _requested_image = None # (source, size) of the texture currently requested from the cache
+    _texture_key = None
+
+    def load_image(self):
+        """
+        Requests the card's image from the app's texture cache, at the size of the image area.
+        Does nothing if the same image at the same size is already displayed or pending,
+        or if the image area has not been laid out inside the card yet (its 'on_size' retries then).
+        """
+        image = self.ids.get('collection_image')
+        if not image or image.width <= 1 or image.height <= 1:
+            return
+        if abs(image.width - (self.width - self.padding[0] - self.padding[2])) >= 1:
+            return
+        source = self.image_source or PLACEHOLDER_IMAGE
+        requested = (source, (int(image.width), int(image.height)))
+        if requested == self._requested_image:
+            return
+        self.unload_image()
+        self._requested_image = requested
+        self._texture_key = App.get_running_app().texture_cache.request(
+            source, requested[1], CARD_IMAGE_RADIUS, self._on_texture_loaded)
+
+    def unload_image(self):
+        """
+        Releases the card's image texture (e.g. when the card is scrolled far offscreen),
+        so the texture cache can evict it.
+        """
+        if self._requested_image is None:
+            return # Nothing loaded or pending
+        if self._texture_key:
+            App.get_running_app().texture_cache.cancel(self._texture_key, self._on_texture_loaded)
+        self._texture_key = None
+        self._requested_image = None
+        image = self.ids.get('collection_image')
+        if image:
+            image.texture = None
+
+    def _on_texture_loaded(self, texture):
+        """
+        Called by the texture cache when the requested image is ready.
+        Falls back to the placeholder if the image could not be loaded.
+        """
+        if texture is None:
+            # '_requested_image' keeps the failed source, so the next visibility pass does not retry it
+            if self._requested_image and self._requested_image[0] != PLACEHOLDER_IMAGE:
+                size = self._requested_image[1]
+                self._texture_key = App.get_running_app().texture_cache.request(
+                    PLACEHOLDER_IMAGE, size, CARD_IMAGE_RADIUS, self._on_texture_loaded)
+            return
+        image = self.ids.get('collection_image')
+        if image:
+            image.texture = texture
 
     def on_collection_tags(self, instance, value):
         """
         Kivy property observer that triggers when 'collection_tags' changes.
         Schedules the '_update_tags_display' method to run on the next frame.
+        Cards that are not in the grid yet are skipped: populate_collections_grid
+        builds their tags through the app's card scheduler.
         """
-        Clock.schedule_once(self._update_tags_display, 0)
+        if self.parent is not None:
+            Clock.schedule_once(self._update_tags_display, 0)
 
     def _update_tags_display(self, dt):
         """
@@ -111,6 +178,13 @@ class ImageChooserPopup(ModalView):
     """
     pass
 
+class FixBrokenPopup(ModalView):
+    """
+    A popup window for repairing the collections flagged by the health check in bulk.
+    Allows users to relocate their paths to a new prefix or drop their missing cover images.
+    """
+    pass
+
 class MainLayout(BoxLayout):
     """
     The main layout of the application, likely containing the grid of collections
@@ -131,12 +205,28 @@ class VisualCollectionApp(App):
     selected_image_path = None
     current_folder_chooser_popup = None 
     current_image_chooser_popup = None 
+    show_broken_only = False
+    health_check_running = False
+    texture_cache = None
+    trigger_visible_cards_update = None
+    tag_suggester = None
+    color_filter_options = ["Any Colour"] + list(COLOR_PRESETS)
+    color_filter = None # (R, G, B) searched in the cover palettes, or None
+    sort_by_hue = False
+    color_index = None
+    palette_extraction_started = False
+    card_scheduler = None
+    loaded_cards = None # Cards whose image was requested by update_visible_cards
 
     def build(self):
         """
         Kivy's method to build the application's UI.
         Returns the root widget of the application.
         """
+        self.texture_cache = TextureCache(budget_bytes=DEFAULT_BUDGET_BYTES)
+        self.trigger_visible_cards_update = Clock.create_trigger(self.update_visible_cards)
+        self.card_scheduler = FrameBudgetScheduler(budget=DEFAULT_FRAME_BUDGET, on_frame=self.update_visible_cards)
+        self.loaded_cards = set()
         return MainLayout()
 
     def on_start(self):
@@ -144,6 +234,11 @@ class VisualCollectionApp(App):
         Kivy's method called after the 'build' method is finished and the root widget is available.
         Used here to populate the initial collection grid.
         """
+        scroll_view = self.root.ids.get('collection_scroll_view')
+        grid = self.root.ids.get('collections_grid')
+        if scroll_view and grid:
+            scroll_view.bind(scroll_y=self.trigger_visible_cards_update, size=self.trigger_visible_cards_update)
+            grid.bind(size=self.trigger_visible_cards_update)
         self.populate_collections_grid()
         self.current_folder_chooser_popup = None
         self.current_image_chooser_popup = None
@@ -173,6 +268,10 @@ class VisualCollectionApp(App):
         if hasattr(popup.ids, 'selected_folder_label'):
             popup.ids.selected_folder_label.text = "No folder selected"
         self.selected_folder_path = None
+
+        if self.tag_suggester is None:
+            self.tag_suggester = TagSuggester().load() # Chargé une seule fois, puis mis à jour à chaque ajout
+        self.update_tag_suggestions()
         
         popup.open()
 
@@ -209,6 +308,7 @@ class VisualCollectionApp(App):
         else:
             self.selected_tags_for_new_collection.add(tag_name)
         self.update_main_tags_button_text(main_tags_button_instance)
+        self.update_tag_suggestions()
         self.tags_dropdown.dismiss()
 
     def update_main_tags_button_text(self, main_tags_button_instance):
@@ -223,6 +323,25 @@ class VisualCollectionApp(App):
         else:
             main_tags_button_instance.text = ", ".join(self.selected_tags_for_new_collection)
 
+    def update_tag_suggestions(self):
+        """
+        Shows the tags suggested for the new collection, ranked from the tags already selected
+        and the selected folder path, as buttons in the NewCollectionPopup.
+        """
+        if not self.current_new_collection_popup or not self.tag_suggester:
+            return
+        suggestions_box = self.current_new_collection_popup.ids.get('suggested_tags_box')
+        if not suggestions_box:
+            return
+
+        suggestions_box.clear_widgets()
+        suggestions = self.tag_suggester.suggest(self.selected_tags_for_new_collection, self.selected_folder_path, limit=5)
+        tags_button = self.current_new_collection_popup.ids.tags_button
+        for tag_name in suggestions:
+            btn = Button(text=tag_name, size_hint_y=None, height='36dp')
+            btn.bind(on_release=lambda btn_instance, tn=tag_name: self.toggle_tag_selection(tn, tags_button))
+            suggestions_box.add_widget(btn)
+
     def prompt_for_new_tag(self, instance):
         """
         Opens a popup dialog for the user to enter a new tag name.
@@ -260,6 +379,8 @@ class VisualCollectionApp(App):
                     new_tag_popup_instance.ids.new_tag_feedback_label.text = f"Tag '{tag_name_to_save}' added."
                 
                 self.selected_tags_for_new_collection.add(tag_name_to_save)
+                if self.tag_suggester:
+                    self.tag_suggester.add_tag(tag_name_to_save)
                 
                 # Dynamically add the new tag button to the existing dropdown
                 if self.tags_dropdown and self.current_new_collection_popup:
@@ -283,6 +404,7 @@ class VisualCollectionApp(App):
                 # Update the main tags button text in the NewCollectionPopup
                 if self.current_new_collection_popup and hasattr(self.current_new_collection_popup.ids, 'tags_button'):
                     self.update_main_tags_button_text(self.current_new_collection_popup.ids.tags_button)
+                    self.update_tag_suggestions()
 
                 # Optionally close the "new tag" popup after a short delay or immediately
                 Clock.schedule_once(lambda dt: new_tag_popup_instance.dismiss(), 0.5) # Dismiss after 0.5 seconds
@@ -332,19 +454,7 @@ class VisualCollectionApp(App):
         Recherche le premier fichier image dans le dossier spécifié.
         Retourne le chemin de l'image ou None si aucune n'est trouvée.
         """
-        if not folder_path or not os.path.isdir(folder_path):
-            return None
-        
-        image_extensions = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp') # Extensions d'images courantes
-        try:
-            for item in os.listdir(folder_path):
-                item_path = os.path.join(folder_path, item)
-                if os.path.isfile(item_path) and item.lower().endswith(image_extensions):
-                    return item_path # Retourne le chemin complet de la première image trouvée
-        except OSError as e:
-            print(f"Error reading folder {folder_path}: {e}")
-            return None
-        return None # Aucune image trouvée
+        return find_first_image_in_folder(folder_path)
 
     def confirm_folder_selection(self, selection):
         """
@@ -375,6 +485,8 @@ class VisualCollectionApp(App):
                     # Optionnel: mettre à jour le hint_text si vous en utilisez un pour indiquer la source
                     # popup_ids.collection_name_input.hint_text = "Nom basé sur le dossier"
 
+                self.update_tag_suggestions()
+
                 first_image = self._find_first_image_in_folder(selected_path)
                 if first_image:
                     self.selected_image_path = first_image
@@ -490,6 +602,8 @@ class VisualCollectionApp(App):
             if collection_id:
                 if feedback_label:
                     feedback_label.text = "Collection saved successfully!"
+                if self.tag_suggester:
+                    self.tag_suggester.add_collection(self.selected_tags_for_new_collection)
                 self.populate_collections_grid() # Rafraîchir la grille
                 # Fermer le popup après un court délai pour que l'utilisateur voie le message
                 Clock.schedule_once(lambda dt: new_collection_popup_instance.dismiss(), 1.5)
@@ -523,24 +637,128 @@ class VisualCollectionApp(App):
             print("Error: collections_grid not found in root ids.")
             return
 
+        self.card_scheduler.clear() # Abandonner la construction en cours d'une grille précédente
+        for card in self.loaded_cards:
+            card.unload_image()
+        self.loaded_cards = set()
         grid.clear_widgets()
         collections_data = get_all_collections() # Va maintenant retourner (id, nom, img, path, tags)
+        if self.show_broken_only:
+            broken_ids = get_broken_collection_ids()
+            collections_data = [row for row in collections_data if row[0] in broken_ids]
+        if self.color_index and self.color_filter:
+            rank = {coll_id: i for i, coll_id in enumerate(self.color_index.search(self.color_filter))}
+            collections_data = sorted((row for row in collections_data if row[0] in rank), key=lambda row: rank[row[0]])
+        if self.color_index and self.sort_by_hue:
+            rows_by_id = {row[0]: row for row in collections_data}
+            collections_data = [rows_by_id[coll_id] for coll_id in self.color_index.sort_by_hue(list(rows_by_id))]
 
         if not collections_data:
             print("No collections found in the database to display.")
             # TODO: Afficher un message à l'utilisateur dans l'interface
             return
 
-        for coll_id, nom, image_path_from_db, folder_path_from_db, tags_concatenes in collections_data:
-            card = CollectionCard(
-                collection_id=coll_id,
-                collection_name=nom,
-                image_source=str(image_path_from_db),
-                collection_tags=str(tags_concatenes if tags_concatenes else ""),
-                folder_path=str(folder_path_from_db if folder_path_from_db else "") # Passer le chemin du dossier
-            )
-            grid.add_widget(card)
-        print(f"Populated grid with {len(collections_data)} collections.")
+        # Cards are built over several frames within a time budget: first the cards above the fold,
+        # then their tags, then the remaining cards, then their tags.
+        above_fold = self._estimate_cards_above_fold(grid)
+        for index, row in enumerate(collections_data):
+            visible = index < above_fold
+            self.card_scheduler.add(lambda row=row: self._build_card(grid, row), priority=0 if visible else 2)
+        print(f"Populating grid with {len(collections_data)} collections.")
+
+    def _build_card(self, grid, row):
+        """
+        Creates the CollectionCard of one collection, adds it to the grid
+        and queues the construction of its tags.
+        """
+        coll_id, nom, image_path_from_db, folder_path_from_db, tags_concatenes = row
+        card = CollectionCard(
+            collection_id=coll_id,
+            collection_name=nom,
+            image_source=str(image_path_from_db or ""), # La miniature pré-générée est résolue par le cache de textures
+            collection_tags=str(tags_concatenes if tags_concatenes else ""),
+            folder_path=str(folder_path_from_db if folder_path_from_db else "") # Passer le chemin du dossier
+        )
+        visible = len(grid.children) < self._estimate_cards_above_fold(grid)
+        grid.add_widget(card)
+        if card.collection_tags:
+            self.card_scheduler.add(lambda: card._update_tags_display(None), priority=1 if visible else 3)
+
+    def _estimate_cards_above_fold(self, grid):
+        """
+        Estimates how many cards fit in the visible part of the grid, plus one row.
+        """
+        scroll_view = self.root.ids.get('collection_scroll_view')
+        cols = grid.cols or 1
+        card_width = max(self._column_width(grid), 1)
+        card_height = card_width * 9 / 16 + dp(70) # Image plus name and one row of tags
+        visible_height = scroll_view.height if scroll_view else grid.height
+        return cols * (math.ceil(visible_height / (card_height + grid.spacing[1])) + 1)
+
+    def _column_width(self, grid):
+        """
+        Returns the width the grid gives each card once it has laid them out.
+        """
+        cols = grid.cols or 1
+        return (grid.width - grid.padding[0] - grid.padding[2] - grid.spacing[0] * (cols - 1)) / cols
+
+    def update_visible_cards(self, *args):
+        """
+        Loads the images of the cards inside (or within one screen of) the visible part of the grid
+        and releases the images of the cards further away, so texture memory stays flat while scrolling.
+        """
+        scroll_view = self.root.ids.get('collection_scroll_view')
+        grid = self.root.ids.get('collections_grid')
+        if not scroll_view or not grid:
+            return
+
+        # Cards added since the grid's last layout still have Kivy's default size and position:
+        # leave them out until the layout resizes them, which fires this pass again through 'on_size'.
+        cards = grid.children # Last added card first
+        column_width = self._column_width(grid)
+        unlaid = 0
+        while unlaid < len(cards) and abs(cards[unlaid].width - column_width) >= 1:
+            unlaid += 1
+        count = len(cards)
+        if unlaid == count:
+            return
+
+        # Visible range in grid coordinates, measured from the bottom of the grid, plus one screen of margin
+        visible_bottom = max(grid.height - scroll_view.height, 0) * scroll_view.scroll_y
+        visible_top = visible_bottom + scroll_view.height
+        low = visible_bottom - scroll_view.height
+        high = visible_top + scroll_view.height
+
+        # Rows go down the grid in the order cards were added: binary search the first and last
+        # rows in range from the first card of each row, instead of scanning every card.
+        cols = grid.cols or 1
+        rows = math.ceil((count - unlaid) / cols)
+        def row_card(row):
+            return cards[count - 1 - row * cols]
+
+        first, last = 0, rows
+        while first < last: # First row whose bottom is below the top of the range
+            middle = (first + last) // 2
+            if row_card(middle).y - grid.y <= high:
+                last = middle
+            else:
+                first = middle + 1
+        start_row = first
+        first, last = start_row, rows
+        while first < last: # First row entirely below the range
+            middle = (first + last) // 2
+            if row_card(middle).top - grid.y < low:
+                last = middle
+            else:
+                first = middle + 1
+        end_row = first
+
+        visible = set(cards[max(count - end_row * cols, unlaid):count - start_row * cols])
+        for card in self.loaded_cards - visible:
+            card.unload_image()
+        for card in visible:
+            card.load_image()
+        self.loaded_cards = visible
 
 
     def open_collection_folder(self, folder_path):
@@ -567,6 +785,143 @@ class VisualCollectionApp(App):
             print(f"Failed to open folder {folder_path}: {e}")
             # Optionnel: Afficher un message d'erreur à l'utilisateur.
 
+    def run_library_health_check(self, force=False):
+        """
+        Starts the library health check in a background thread so the window stays responsive.
+        The grid is refreshed on the main thread once the check is finished.
+        Args:
+            force (bool): If True, also re-check collections that were verified recently.
+        """
+        if self.health_check_running:
+            print("A health check is already running.")
+            return
+        self.health_check_running = True
+
+        def worker():
+            try:
+                statuses = run_health_check(max_age_seconds=None if force else DEFAULT_MAX_AGE)
+                broken = sum(1 for status in statuses.values() if status != 'ok')
+                print(f"Health check finished: {len(statuses)} collections checked, {broken} broken.")
+            except Exception as e:
+                print(f"Error during health check: {e}")
+            finally:
+                Clock.schedule_once(self._on_health_check_finished, 0)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_health_check_finished(self, dt):
+        """
+        Called on the main thread when the background health check is done.
+        """
+        self.health_check_running = False
+        self.populate_collections_grid()
+
+    def toggle_broken_filter(self, state):
+        """
+        Shows only the collections flagged by the last health check, or every collection.
+        Args:
+            state (str): The state of the toggle button ('down' or 'normal').
+        """
+        self.show_broken_only = state == 'down'
+        self.populate_collections_grid()
+
+    def open_fix_broken_popup(self):
+        """
+        Opens the popup for repairing the broken collections in bulk.
+        """
+        popup = FixBrokenPopup()
+        broken_count = len(get_broken_collection_ids())
+        if hasattr(popup.ids, 'fix_feedback_label'):
+            popup.ids.fix_feedback_label.text = f"{broken_count} broken collection(s)."
+        popup.open()
+
+    def relocate_broken_collections(self, old_prefix, new_prefix, fix_popup_instance):
+        """
+        Replaces 'old_prefix' with 'new_prefix' in the paths of every broken collection,
+        then re-checks them.
+        Args:
+            old_prefix (str): The path prefix to replace (e.g. the old drive or mount point).
+            new_prefix (str): The replacement path prefix.
+            fix_popup_instance: The instance of the FixBrokenPopup.
+        """
+        feedback_label = fix_popup_instance.ids.get('fix_feedback_label')
+        if not old_prefix.strip():
+            if feedback_label:
+                feedback_label.text = "Old path prefix cannot be empty."
+            return
+
+        updated = relocate_collections(get_broken_collection_ids(), old_prefix.strip(), new_prefix.strip())
+        if feedback_label:
+            feedback_label.text = f"{updated} collection(s) relocated."
+        self.run_library_health_check()
+
+    def clear_broken_covers(self, fix_popup_instance):
+        """
+        Removes the missing cover images of every broken collection so their cards use the placeholder.
+        Args:
+            fix_popup_instance: The instance of the FixBrokenPopup.
+        """
+        updated = clear_missing_covers(get_broken_collection_ids())
+        feedback_label = fix_popup_instance.ids.get('fix_feedback_label')
+        if feedback_label:
+            feedback_label.text = f"{updated} missing cover(s) cleared."
+        self.populate_collections_grid()
+
+    def set_color_filter(self, color_name):
+        """
+        Shows only the collections whose cover contains a colour close to the chosen preset.
+        Args:
+            color_name (str): A name from COLOR_PRESETS, or "Any Colour" to remove the filter.
+        """
+        self.color_filter = COLOR_PRESETS.get(color_name)
+        self._ensure_color_index()
+        self.populate_collections_grid()
+
+    def toggle_hue_sort(self, state):
+        """
+        Sorts the grid by the hue of each cover's dominant colour, or by creation date.
+        Args:
+            state (str): The state of the toggle button ('down' or 'normal').
+        """
+        self.sort_by_hue = state == 'down'
+        self._ensure_color_index()
+        self.populate_collections_grid()
+
+    def _ensure_color_index(self):
+        """
+        Loads the colour index the first time a colour feature is used, and extracts the palettes
+        of covers that do not have one yet in the background; the grid is refreshed once they are ready.
+        Extraction runs 'colors.py' in a separate Python process, so its worker processes never import Kivy
+        or inherit the window's OpenGL context.
+        """
+        if self.color_index is None:
+            self.color_index = ColorIndex().load()
+        if self.palette_extraction_started:
+            return
+        self.palette_extraction_started = True
+
+        def worker():
+            script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'colors.py')
+            try:
+                result = subprocess.run([sys.executable, script])
+            except OSError as e:
+                print(f"Error extracting colour palettes: {e}")
+                return
+            if result.returncode == 0:
+                Clock.schedule_once(self._on_palettes_extracted, 0)
+            else:
+                print(f"Error extracting colour palettes: 'colors.py' exited with code {result.returncode}")
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_palettes_extracted(self, dt):
+        """
+        Called on the main thread when new palettes were extracted in the background.
+        """
+        self.color_index = ColorIndex().load()
+        if self.color_filter or self.sort_by_hue:
+            self.populate_collections_grid()
+
 if __name__ == '__main__':
     initialize_database()
     VisualCollectionApp().run()
\ No newline at end of file
@@ -0,0 +1,174 @@
+import heapq
+import os
+import re
+
+from database import get_tag_cooccurrence
+
+PATH_MATCH_SCORE = 1.0 # Score added to a tag whose words all appear in the folder path
+POPULARITY_SCORE = 0.1 # Weight of how often a tag is used, to rank tags when nothing else matches
+
+_WORD_SPLIT = re.compile(r"[\W_]+")
+
+def _words(text):
+    """
+    Splits a tag name or a path into lowercase words.
+    """
+    return [word for word in _WORD_SPLIT.split(text.lower()) if word]
+
+class TagSuggester:
+    """
+    Ranks tag suggestions for a new collection from the tags already selected and its folder path.
+    Suggestions are served from an in-memory copy of the sparse TagCooccurrence index,
+    which is loaded once and then updated incrementally as collections are added.
+    """
+
+    def __init__(self):
+        self.tag_ids = {} # name -> tag_id
+        self.tag_names = {} # tag_id -> name
+        self.cooccurrence = {} # tag_id -> {other_tag_id: count}; cooccurrence[t][t] is the usage count of t
+        self.words_index = {} # word -> set of tag_ids whose name contains it
+        self.max_count = 1
+        self.popular = [] # tag_ids, most used first
+        self.popular_pos = {} # tag_id -> index in popular
+        self._usage_start = {} # usage count -> index in popular of the first tag used that many times
+
+    def load(self):
+        """
+        Loads the tag names and the co-occurrence index from the database.
+        """
+        tags, pairs = get_tag_cooccurrence()
+        self.tag_ids = {}
+        self.tag_names = {}
+        self.cooccurrence = {}
+        self.words_index = {}
+        self.popular = []
+        self.popular_pos = {}
+        self._usage_start = {}
+        for tag_id, name in tags:
+            self._add_tag(tag_id, name)
+        for tag_id, other_tag_id, count in pairs:
+            self.cooccurrence.setdefault(tag_id, {})[other_tag_id] = count
+        self.max_count = max((row.get(tag_id, 0) for tag_id, row in self.cooccurrence.items()), default=0) or 1
+
+        self.popular.sort(key=lambda tag_id: -self._usage(tag_id))
+        self.popular_pos = {tag_id: i for i, tag_id in enumerate(self.popular)}
+        for i, tag_id in reversed(list(enumerate(self.popular))):
+            self._usage_start[self._usage(tag_id)] = i
+        return self
+
+    def _usage(self, tag_id):
+        """
+        Returns the number of collections that have a tag.
+        """
+        row = self.cooccurrence.get(tag_id)
+        return row.get(tag_id, 0) if row else 0
+
+    def _add_tag(self, tag_id, name):
+        """
+        Adds a tag to the name lookups and to the word index used for folder path matches.
+        """
+        self.tag_ids[name] = tag_id
+        self.tag_names[tag_id] = name
+        for word in _words(name):
+            self.words_index.setdefault(word, set()).add(tag_id)
+        if tag_id not in self.popular_pos: # Unused so far, so it ranks last
+            self.popular_pos[tag_id] = len(self.popular)
+            self._usage_start.setdefault(0, len(self.popular))
+            self.popular.append(tag_id)
+
+    def add_tag(self, name, tag_id=None):
+        """
+        Registers a tag created after the index was loaded.
+        """
+        if name in self.tag_ids:
+            return
+        if tag_id is None:
+            tag_id = min(min(self.tag_names, default=0), 0) - 1 # Temporary ID until the next load
+        self._add_tag(tag_id, name)
+
+    def add_collection(self, tag_names):
+        """
+        Updates the in-memory index after a collection with these tags was added to the database.
+        """
+        tag_ids = []
+        for name in dict.fromkeys(tag_names):
+            self.add_tag(name)
+            tag_ids.append(self.tag_ids[name])
+        for tag_id in tag_ids:
+            row = self.cooccurrence.setdefault(tag_id, {})
+            for other_tag_id in tag_ids:
+                row[other_tag_id] = row.get(other_tag_id, 0) + 1
+            self.max_count = max(self.max_count, row[tag_id])
+            self._promote(tag_id, row[tag_id] - 1)
+
+    def _promote(self, tag_id, old_usage):
+        """
+        Moves a tag whose usage count just went up by one to its new place in the popularity ranking:
+        it swaps places with the first tag of its old usage count, which makes it the last of the new count.
+        """
+        position = self.popular_pos[tag_id]
+        first = self._usage_start[old_usage]
+        first_tag_id = self.popular[first]
+        self.popular[first], self.popular[position] = tag_id, first_tag_id
+        self.popular_pos[tag_id], self.popular_pos[first_tag_id] = first, position
+
+        following = first + 1
+        if following < len(self.popular) and self._usage(self.popular[following]) == old_usage:
+            self._usage_start[old_usage] = following
+        else:
+            del self._usage_start[old_usage]
+        self._usage_start.setdefault(old_usage + 1, first)
+
+    def suggest(self, selected_tags=(), folder_path=None, limit=10):
+        """
+        Returns the tags most likely to be added next.
+
+        Args:
+            selected_tags (iterable): The names of the tags already selected.
+            folder_path (str): The folder of the new collection; tags whose words appear in it are suggested.
+            limit (int): The maximum number of suggestions.
+
+        Returns:
+            list: Tag names, best suggestion first. Selected tags are never suggested.
+        """
+        selected_ids = {self.tag_ids[name] for name in selected_tags if name in self.tag_ids}
+        scores = {}
+
+        # Co-occurrence: for each selected tag s, add P(other | s) = count(s, other) / count(s)
+        for tag_id in selected_ids:
+            row = self.cooccurrence.get(tag_id)
+            if not row:
+                continue
+            total = row.get(tag_id) or 1
+            for other_tag_id, count in row.items():
+                scores[other_tag_id] = scores.get(other_tag_id, 0.0) + count / total
+
+        # Folder path: tags whose every word is one of the path's words
+        if folder_path:
+            path_words = set(_words(os.path.normpath(folder_path)))
+            candidates = set()
+            for word in path_words:
+                candidates.update(self.words_index.get(word, ()))
+            for tag_id in candidates:
+                if set(_words(self.tag_names[tag_id])) <= path_words:
+                    scores[tag_id] = scores.get(tag_id, 0.0) + PATH_MATCH_SCORE
+
+        # Popularity: fills in from the precomputed ranking when nothing matched,
+        # otherwise only breaks ties between already scored tags
+        if not scores:
+            best = []
+            for tag_id in self.popular:
+                if len(best) >= limit or not self._usage(tag_id):
+                    break
+                if tag_id not in selected_ids:
+                    best.append(self.tag_names[tag_id])
+            return best
+        for tag_id in scores:
+            row = self.cooccurrence.get(tag_id)
+            usage = row.get(tag_id, 0) if row else 0
+            scores[tag_id] += POPULARITY_SCORE * usage / self.max_count
+
+        for tag_id in selected_ids:
+            scores.pop(tag_id, None)
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [self.tag_names[tag_id] for tag_id, score in best if tag_id in self.tag_names]
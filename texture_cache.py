@@ -0,0 +1,197 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from kivy.clock import Clock
+from kivy.core.image import Image as CoreImage
+from kivy.graphics.texture import Texture
+
+try:
+    from PIL import Image, ImageChops, ImageDraw, ImageOps
+except ImportError: # Without Pillow, textures are loaded full size by Kivy and corners are not rounded
+    Image = None
+
+from thumbnails import get_cached_thumbnail
+
+DEFAULT_BUDGET_BYTES = 192 * 1024 * 1024
+SIZE_STEP = 64 # Requested widths are rounded up to a multiple of this, so small resizes reuse the cached texture
+CORNER_SUPERSAMPLING = 4 # The corner mask is drawn larger then downscaled, for antialiased edges
+
+def _bucket_size(width, height):
+    """
+    Rounds a requested pixel size up to the next size bucket, keeping its aspect ratio.
+    """
+    width, height = max(int(width), 1), max(int(height), 1)
+    bucket_width = -(-width // SIZE_STEP) * SIZE_STEP
+    return bucket_width, max(1, round(height * bucket_width / width))
+
+def _decode_rounded(source, size, radius):
+    """
+    Worker executed in the thread pool: decodes an image, crops and scales it to cover 'size'
+    and bakes the rounded corners into its alpha channel.
+    The thumbnail pre-generated by 'cli.py thumbnails' is decoded instead of the source when it exists.
+
+    Returns:
+        bytes: The RGBA pixels, bottom row first as Kivy textures expect.
+    """
+    with Image.open(get_cached_thumbnail(source) or source) as img:
+        img.draft('RGB', size) # Lets JPEG decoding skip most of the full-size work
+        img = ImageOps.fit(img.convert('RGBA'), size, method=Image.BILINEAR)
+
+    if radius > 0:
+        big_size = (size[0] * CORNER_SUPERSAMPLING, size[1] * CORNER_SUPERSAMPLING)
+        mask = Image.new('L', big_size, 0)
+        ImageDraw.Draw(mask).rounded_rectangle((0, 0, big_size[0] - 1, big_size[1] - 1),
+                                               radius=radius * CORNER_SUPERSAMPLING, fill=255)
+        mask = mask.resize(size, Image.BILINEAR)
+        img.putalpha(ImageChops.multiply(img.getchannel('A'), mask))
+    return img.transpose(Image.FLIP_TOP_BOTTOM).tobytes()
+
+def _resolve_source(source):
+    """
+    Worker executed in the thread pool when Pillow is not installed: finds the file Kivy should load.
+    """
+    return get_cached_thumbnail(source) or source
+
+class TextureCache:
+    """
+    Keeps decoded image textures in an LRU bounded by a memory budget in bytes.
+    Images are decoded at the size they are displayed at, with their rounded corners
+    baked in, so widgets can draw them without a stencil mask.
+    Textures are created on the main thread; decoding happens in a thread pool.
+    Without Pillow, only the file lookup runs in the thread pool: Kivy then decodes the image on the main thread.
+    """
+
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES, max_workers=2):
+        """
+        Args:
+            budget_bytes (int): The maximum number of bytes of texture memory kept in the cache.
+            max_workers (int): The number of threads used to decode images.
+        """
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self._textures = OrderedDict() # key -> (texture, byte size), least recently used first
+        self._pending = {} # key -> (future, callbacks waiting for the texture)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def set_budget(self, budget_bytes):
+        """
+        Changes the memory budget, evicting textures immediately if the cache is now too large.
+        """
+        self.budget_bytes = budget_bytes
+        self._evict()
+
+    def request(self, source, size, radius, callback):
+        """
+        Requests the texture of an image at a given pixel size with rounded corners.
+        The callback is called with the texture immediately if it is cached,
+        otherwise on the main thread once the image is decoded (with None if decoding failed).
+
+        Args:
+            source (str): The file system path to the image.
+            size (tuple): The (width, height) in pixels the image is displayed at.
+            radius (float): The corner radius in pixels.
+            callback (callable): Called with the texture.
+
+        Returns:
+            tuple: The cache key of the request, to be passed to 'cancel'.
+        """
+        bucket = _bucket_size(*size)
+        radius = round(radius * bucket[0] / max(int(size[0]), 1)) # Corners keep their on-screen size once scaled down
+        key = (source, bucket, radius)
+
+        entry = self._textures.get(key)
+        if entry:
+            self._textures.move_to_end(key)
+            callback(entry[0])
+            return key
+
+        if key in self._pending:
+            self._pending[key][1].append(callback)
+            return key
+
+        if Image is None:
+            future = self._executor.submit(_resolve_source, source)
+        else:
+            future = self._executor.submit(_decode_rounded, source, bucket, radius)
+        self._pending[key] = (future, [callback])
+        future.add_done_callback(lambda f: Clock.schedule_once(lambda dt: self._on_decoded(key, f), 0))
+        return key
+
+    def cancel(self, key, callback):
+        """
+        Cancels a pending request, e.g. when its widget scrolled offscreen before the image was ready.
+        Once no callback waits for the image, its decoding is dropped if it has not started yet,
+        so images still on screen do not queue behind it; a decoding already running is cached when it finishes.
+        """
+        entry = self._pending.get(key)
+        if not entry or callback not in entry[1]:
+            return
+        future, callbacks = entry
+        callbacks.remove(callback)
+        if not callbacks and future.cancel():
+            del self._pending[key]
+
+    def clear(self):
+        """
+        Drops every cached texture.
+        """
+        self._textures.clear()
+        self.used_bytes = 0
+
+    def _on_decoded(self, key, future):
+        """
+        Called on the main thread when a worker finished decoding an image.
+        """
+        entry = self._pending.get(key)
+        if entry is None or entry[0] is not future:
+            return # Cancelled, or replaced by a newer request for the same image
+        del self._pending[key]
+        callbacks = entry[1]
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Error loading image {key[0]}: {e}")
+            result = None
+
+        if result is None:
+            texture = None
+        elif Image is None:
+            texture = self._load_without_pillow(result)
+        else:
+            texture = Texture.create(size=key[1], colorfmt='rgba')
+            texture.blit_buffer(result, colorfmt='rgba', bufferfmt='ubyte')
+        if texture:
+            self._store(key, texture)
+        for callback in callbacks:
+            callback(texture)
+
+    def _load_without_pillow(self, path):
+        """
+        Fallback used when Pillow is not installed: Kivy loads the image at its full size, synchronously on the main thread.
+
+        Returns:
+            Texture or None: The texture, or None if the image could not be loaded.
+        """
+        try:
+            return CoreImage(path).texture
+        except Exception as e:
+            print(f"Error loading image {path}: {e}")
+            return None
+
+    def _store(self, key, texture):
+        """
+        Adds a texture to the LRU and evicts the least recently used ones over the budget.
+        """
+        byte_size = texture.width * texture.height * 4
+        self._textures[key] = (texture, byte_size)
+        self.used_bytes += byte_size
+        self._evict()
+
+    def _evict(self):
+        """
+        Drops the least recently used textures until the cache fits in its budget.
+        The most recently used texture is always kept.
+        """
+        while self.used_bytes > self.budget_bytes and len(self._textures) > 1:
+            _, (_, byte_size) = self._textures.popitem(last=False)
+            self.used_bytes -= byte_size
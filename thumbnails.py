@@ -0,0 +1,117 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError: # Pillow is only needed to generate thumbnails, not to look them up
+    Image = None
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp') # Extensions d'images courantes
+THUMBNAIL_DIR = 'thumbnails'
+THUMBNAIL_SIZE = (480, 270) # 16:9, matching the image area of a CollectionCard
+
+def find_first_image_in_folder(folder_path):
+    """
+    Recherche le premier fichier image dans le dossier spécifié.
+    Retourne le chemin de l'image ou None si aucune n'est trouvée.
+    """
+    if not folder_path or not os.path.isdir(folder_path):
+        return None
+
+    try:
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                    return entry.path # Retourne le chemin complet de la première image trouvée
+    except OSError as e:
+        print(f"Error reading folder {folder_path}: {e}")
+        return None
+    return None # Aucune image trouvée
+
+def thumbnail_path_for(image_path):
+    """
+    Returns the path of the cached thumbnail for an image.
+    The name depends on the image's path, size and modification time,
+    so a thumbnail is regenerated when its source image changes.
+
+    Args:
+        image_path (str): The file system path to the source image.
+
+    Returns:
+        str or None: The thumbnail path, or None if the source image does not exist.
+    """
+    try:
+        stat = os.stat(image_path)
+    except OSError:
+        return None
+    key = f"{os.path.abspath(image_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return os.path.join(THUMBNAIL_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.jpg')
+
+def get_cached_thumbnail(image_path):
+    """
+    Returns the path of an already generated thumbnail for an image, without generating it.
+
+    Args:
+        image_path (str): The file system path to the source image.
+
+    Returns:
+        str or None: The thumbnail path if it exists, otherwise None.
+    """
+    if not image_path:
+        return None
+    thumbnail_path = thumbnail_path_for(image_path)
+    if thumbnail_path and os.path.isfile(thumbnail_path):
+        return thumbnail_path
+    return None
+
+def ensure_thumbnail(image_path):
+    """
+    Generates the thumbnail of an image if it is not cached yet.
+
+    Args:
+        image_path (str): The file system path to the source image.
+
+    Returns:
+        str or None: The thumbnail path, or None if it could not be generated.
+    """
+    thumbnail_path = thumbnail_path_for(image_path)
+    if not thumbnail_path:
+        return None
+    if os.path.isfile(thumbnail_path):
+        return thumbnail_path
+    if Image is None:
+        print("Pillow is not installed: cannot generate thumbnails.")
+        return None
+
+    try:
+        os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+        with Image.open(image_path) as img:
+            img.draft('RGB', THUMBNAIL_SIZE) # Lets JPEG decoding skip most of the full-size work
+            img = img.convert('RGB')
+            img.thumbnail(THUMBNAIL_SIZE)
+            tmp_path = thumbnail_path + '.tmp'
+            img.save(tmp_path, 'JPEG', quality=85)
+        os.replace(tmp_path, thumbnail_path)
+        return thumbnail_path
+    except (OSError, ValueError) as e:
+        print(f"Error generating thumbnail for {image_path}: {e}")
+        return None
+
+def prewarm_thumbnails(image_paths, max_workers=4):
+    """
+    Generates the missing thumbnails of many images in a thread pool.
+
+    Args:
+        image_paths (iterable): The file system paths to the source images.
+        max_workers (int): The number of threads used to decode images.
+
+    Yields:
+        tuple: (image_path, thumbnail_path or None) as each image is processed.
+    """
+    if Image is None:
+        print("Pillow is not installed: cannot generate thumbnails.")
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        image_paths = [path for path in image_paths if path]
+        yield from zip(image_paths, executor.map(ensure_thumbnail, image_paths))